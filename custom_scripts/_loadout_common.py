@@ -0,0 +1,212 @@
+"""
+Helpers shared by the loadout fixer scripts (add_fnx45_to_m79_sets.py,
+fix_m79_ammo.py, move_fnx45_from_hands_to_cargo.py, update_ammo_amts.py)
+and by add_roaming_patrols.py
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+    # One parser per process: it keeps its internal buffers from file to file
+    _PARSER = simdjson.Parser()
+except ImportError:
+    simdjson = None
+
+# Size/mtime of the files each fixer last left in a known-good state
+STAMP_FILE = Path(__file__).parent / '.fixstamp.json'
+
+# orjson only indents by 2 spaces; used to double it back to the 4-space layout
+_INDENT_RE = re.compile(rb'(?m)^( +)')
+
+
+# Parse JSON bytes or str with orjson when it is installed, otherwise the stdlib json module
+loads_json = orjson.loads if orjson is not None else json.loads
+
+
+def load_json(path, raw=None):
+    """Parse a JSON file with loads_json; pass raw if the bytes were already read"""
+    if raw is None:
+        raw = Path(path).read_bytes()
+    return loads_json(raw)
+
+
+def lazy_check(raw, predicate):
+    """
+    Run predicate on a lazy simdjson document of raw, materializing only what it touches.
+
+    predicate may only use .get() and iteration so it also works on plain dicts.
+    Returns its result as a bool, or None when simdjson is not installed. The
+    document is released before returning: the per-process parser can't parse
+    again while proxies into its previous document are alive.
+    """
+    if simdjson is None:
+        return None
+    doc = _PARSER.parse(raw)
+    try:
+        return bool(predicate(doc))
+    finally:
+        del doc
+
+
+def file_stamp(path):
+    """Return the [size, mtime_ns] stamp of a file"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def stamp_key(path):
+    """Key a file by absolute path so stamps survive running from another directory"""
+    return os.path.abspath(path)
+
+
+def _read_stamp_file():
+    try:
+        return json.loads(STAMP_FILE.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+
+def load_stamps(name):
+    """
+    Return the {path: [size, mtime_ns]} stamps recorded under name.
+
+    name is the script name, plus any parameters that change its output. A file
+    whose current file_stamp matches its entry was already processed and can be
+    skipped. Read this once at startup rather than per file.
+    """
+    return _read_stamp_file().get(name, {})
+
+
+def save_stamps(name, stamps):
+    """Replace the stamps recorded under name, keeping those of the other scripts"""
+    all_stamps = _read_stamp_file()
+    all_stamps[name] = stamps
+    try:
+        tmp_file = STAMP_FILE.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps(all_stamps, indent=2), encoding='utf-8')
+        os.replace(tmp_file, STAMP_FILE)
+    except OSError as e:
+        print(f"Warning: could not save {STAMP_FILE}: {e}")
+
+
+def dumps_json(data):
+    """
+    Serialize data to UTF-8 bytes in the same layout as json.dump(indent=4, ensure_ascii=False).
+
+    Uses orjson when it is installed, otherwise the stdlib json module.
+    """
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        return _INDENT_RE.sub(lambda m: m.group(1) * 2, payload)
+    return json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+
+
+def write_bytes_atomic(path, payload, fsync=False):
+    """
+    Replace a file's contents in a single write without ever leaving it truncated.
+
+    The bytes go to <path>.tmp first, which is then renamed over path; a crash
+    mid-write leaves the original intact. With fsync=True the data is also
+    flushed to disk before the rename.
+    """
+    path = Path(path)
+    tmp_file = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def dump_json(path, data):
+    """Atomically write data with dumps_json"""
+    write_bytes_atomic(path, dumps_json(data))
+
+
+def run_pipeline(paths, transform, jobs=None):
+    """
+    Run transform(path, raw) over many files with disk I/O overlapped with parsing.
+
+    A reader thread reads files ahead, worker processes run transform on the
+    bytes, and a writer thread writes back whatever they return. transform must
+    be picklable and return (result, new_bytes), with new_bytes None when the
+    file should be left alone. At most 2 * jobs files are held in memory at once,
+    counting those read ahead, in the workers and waiting to be written. Returns
+    (path, result) pairs in completion order; files that could not be read or
+    written back are left out.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    # One slot per file from before it is read until it is written (or needs no write)
+    slots = threading.Semaphore(2 * jobs)
+    read_queue = queue.Queue()
+    write_queue = queue.Queue()
+    failed_writes = set()
+
+    def reader():
+        for path in paths:
+            slots.acquire()
+            try:
+                read_queue.put((path, Path(path).read_bytes()))
+            except OSError as e:
+                print(f"Error reading {path}: {e}")
+                slots.release()
+        read_queue.put(None)
+
+    def writer():
+        while (item := write_queue.get()) is not None:
+            path, payload = item
+            try:
+                write_bytes_atomic(path, payload)
+            except OSError as e:
+                print(f"Error writing {path}: {e}")
+                failed_writes.add(path)
+            slots.release()
+
+    threads = [threading.Thread(target=reader, daemon=True), threading.Thread(target=writer, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    results = []
+
+    def collect(done):
+        for future in done:
+            path = pending.pop(future)
+            result, payload = future.result()
+            results.append((path, result))
+            if payload is not None:
+                write_queue.put((path, payload))
+            else:
+                slots.release()
+
+    pending = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while (item := read_queue.get()) is not None:
+            path, raw = item
+            pending[executor.submit(transform, path, raw)] = path
+            # Hand finished files on promptly so their slots free up for the reader
+            collect([future for future in pending if future.done()])
+            if len(pending) >= 2 * jobs:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        collect(list(pending))
+
+    write_queue.put(None)
+    for thread in threads:
+        thread.join()
+    return [(path, result) for path, result in results if path not in failed_writes]
@@ -0,0 +1,32 @@
+"""
+Helpers shared by the filter_snafu_*.py scripts
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+
+@lru_cache(maxsize=None)
+def load_keep(keep_file):
+    """Read types-keep.txt into a frozenset of type names (empty lines ignored)"""
+    lines = Path(keep_file).read_text(encoding='utf-8').splitlines()
+    return frozenset(line.strip() for line in lines if line.strip())
+
+
+def read_header(xml_file, default, chunk_size=1 << 16):
+    """
+    Return everything before the first <type> entry (declaration, comments, root tag),
+    reading only as far into the file as needed. Falls back to default if there
+    are no entries.
+    """
+    marker = '<type name="'
+    header = ''
+    with open(xml_file, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            start = max(0, len(header) - len(marker))
+            header += chunk
+            idx = header.find(marker, start)
+            if idx != -1:
+                # Drop the first entry's indentation, it is written per entry
+                return header[:idx].rstrip(' \t')
+    return default
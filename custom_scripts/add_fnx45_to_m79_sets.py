@@ -24,8 +24,12 @@ import json
 import argparse
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
+from _loadout_common import dumps_json, load_json, loads_json, write_bytes_atomic
+
 # FNX45 weapon configuration based on existing loadout patterns
 FNX45_WEAPON_CONFIG = {
     "ClassName": "FNX45",
@@ -75,40 +79,29 @@ FNX45_MAGAZINE_CONFIG = {
     "Sets": []
 }
 
-def has_m79_and_ammo(set_item):
-    """Check if a Set contains M79 and its ammo"""
-    has_m79 = False
-    has_ammo = False
-    
-    # Check InventoryAttachments for M79
-    for attachment in set_item.get("InventoryAttachments", []):
-        for item in attachment.get("Items", []):
-            if item.get("ClassName") == "M79":
-                has_m79 = True
-                break
-    
-    # Check InventoryCargo for Ammo_40mm_Explosive
-    for cargo_item in set_item.get("InventoryCargo", []):
-        if cargo_item.get("ClassName") == "Ammo_40mm_Explosive":
-            has_ammo = True
-            break
-    
-    return has_m79 and has_ammo
+# Templates are serialized once and parsed per use so every Set gets its own
+# nested lists (a shallow .copy() shared Health/InventoryCargo/... between Sets)
+_FNX45_WEAPON_JSON = json.dumps(FNX45_WEAPON_CONFIG)
+_FNX45_MAGAZINE_JSON = json.dumps(FNX45_MAGAZINE_CONFIG)
 
-def has_fnx45(set_item):
-    """Check if a Set already contains FNX45"""
-    # Check InventoryAttachments for FNX45
+def _index_set(set_item):
+    """Collect a Set's class names once: ({SlotName: {ClassName}}, {cargo ClassName})"""
+    attachments = {}
     for attachment in set_item.get("InventoryAttachments", []):
-        for item in attachment.get("Items", []):
-            if item.get("ClassName") == "FNX45":
-                return True
-    
-    # Check InventoryCargo for FNX45
-    for cargo_item in set_item.get("InventoryCargo", []):
-        if cargo_item.get("ClassName") == "FNX45":
-            return True
-    
-    return False
+        attachments.setdefault(attachment.get("SlotName", ""), set()).update(
+            item.get("ClassName") for item in attachment.get("Items", [])
+        )
+    cargo = {cargo_item.get("ClassName") for cargo_item in set_item.get("InventoryCargo", [])}
+    return attachments, cargo
+
+def has_m79_and_ammo(attachments, cargo):
+    """Check if an indexed Set contains M79 and its ammo"""
+    return (any("M79" in names for names in attachments.values())
+            and "Ammo_40mm_Explosive" in cargo)
+
+def has_fnx45(attachments, cargo):
+    """Check if an indexed Set already contains FNX45"""
+    return any("FNX45" in names for names in attachments.values()) or "FNX45" in cargo
 
 def add_fnx45_to_set(set_item):
     """Add FNX45 pistol and 2 magazines to a Set"""
@@ -133,7 +126,7 @@ def add_fnx45_to_set(set_item):
         modifications_made.append("Created new Hands attachment slot")
     
     # Add FNX45 to Hands slot
-    hands_attachment["Items"].append(FNX45_WEAPON_CONFIG.copy())
+    hands_attachment["Items"].append(loads_json(_FNX45_WEAPON_JSON))
     modifications_made.append("Added FNX45 pistol to Hands slot")
     
     # Add 2 extra magazines to InventoryCargo
@@ -141,17 +134,17 @@ def add_fnx45_to_set(set_item):
         set_item["InventoryCargo"] = []
     
     # Add 2 magazines
-    set_item["InventoryCargo"].append(FNX45_MAGAZINE_CONFIG.copy())
-    set_item["InventoryCargo"].append(FNX45_MAGAZINE_CONFIG.copy())
+    set_item["InventoryCargo"].append(loads_json(_FNX45_MAGAZINE_JSON))
+    set_item["InventoryCargo"].append(loads_json(_FNX45_MAGAZINE_JSON))
     modifications_made.append("Added 2x Mag_FNX45_15Rnd to InventoryCargo")
     
     return modifications_made
 
-def process_loadout_file(file_path, dry_run=False):
-    """Process a single loadout file"""
+def process_loadout_file(file_path, dry_run=False, fsync=True):
+    """Process a single loadout file, fsync-ing the rewrite unless fsync=False"""
+    print(f"\nProcessing {file_path}...")
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(file_path)
     except (json.JSONDecodeError, FileNotFoundError) as e:
         print(f"Error reading {file_path}: {e}")
         return False
@@ -161,8 +154,9 @@ def process_loadout_file(file_path, dry_run=False):
     
     # Process all Sets in the loadout
     for set_item in data.get("Sets", []):
-        if has_m79_and_ammo(set_item):
-            if has_fnx45(set_item):
+        attachments, cargo = _index_set(set_item)
+        if has_m79_and_ammo(attachments, cargo):
+            if has_fnx45(attachments, cargo):
                 print(f"  Set already has FNX45, skipping")
                 continue
             
@@ -178,8 +172,7 @@ def process_loadout_file(file_path, dry_run=False):
     if sets_modified > 0:
         if not dry_run:
             # Write back to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            write_bytes_atomic(file_path, dumps_json(data), fsync=fsync)
             print(f"[MODIFIED] Modified {sets_modified} Sets in {file_path}")
         else:
             print(f"[DRY RUN] Would modify {sets_modified} Sets in {file_path}")
@@ -206,15 +199,25 @@ def main():
             "config/ExpansionMod/Loadouts/WestLoadout.json"
         ]
         
-        files_modified = 0
+        existing_files = []
         for file_path in loadout_files:
             if os.path.exists(file_path):
-                print(f"\nProcessing {file_path}...")
-                if process_loadout_file(file_path, args.dry_run):
-                    files_modified += 1
+                existing_files.append(file_path)
             else:
                 print(f"[WARNING] File not found: {file_path}")
         
+        # Files are independent, so parse/rewrite them in parallel processes.
+        # Where available, one os.sync() at the end replaces an fsync per file.
+        batch_sync = hasattr(os, 'sync')
+        files_modified = 0
+        if existing_files:
+            worker = partial(process_loadout_file, dry_run=args.dry_run, fsync=not batch_sync)
+            max_workers = min(len(existing_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                files_modified = sum(executor.map(worker, existing_files))
+        if batch_sync and files_modified and not args.dry_run:
+            os.sync()
+        
         if args.dry_run:
             print(f"\n[DRY RUN] Would modify {files_modified} files total")
         else:
@@ -225,7 +228,6 @@ def main():
             print(f"Error: File not found: {args.file}")
             sys.exit(1)
         
-        print(f"Processing {args.file}...")
         process_loadout_file(args.file, args.dry_run)
     
     else:
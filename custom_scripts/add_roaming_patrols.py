@@ -11,76 +11,76 @@ import re
 import argparse
 from pathlib import Path
 
+from _loadout_common import write_bytes_atomic
 
-def parse_roamers_file(filepath):
-    """Parse add_roamers.txt to extract patrol names and coordinates"""
-    patrols = []
-
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        # Skip empty lines
-        if not line:
-            i += 1
-            continue
 
-        # Check if this is a location name
-        if i + 1 < len(lines):
-            next_line = lines[i + 1].strip()
-            # Look for coordinate pattern <x, y, z>
-            coord_match = re.match(r'<([\d.]+),\s*([\d.]+),\s*([\d.]+)>', next_line)
+# A non-empty name line directly followed by a "<x, y, z>" coordinate line
+ROAMER_PATTERN = re.compile(
+    r'^[ \t]*(?P<name>\S[^\n]*?)[ \t]*\n'
+    r'[ \t]*<([\d.]+),[ \t]*([\d.]+),[ \t]*([\d.]+)>',
+    re.MULTILINE
+)
 
-            if coord_match:
-                name = line
-                x = float(coord_match.group(1))
-                y = float(coord_match.group(2))
-                z = float(coord_match.group(3))
 
-                patrols.append({
-                    'name': name,
-                    'coords': [x, y, z]
-                })
-                i += 2  # Skip both name and coordinate lines
-                continue
-
-        i += 1
+def parse_roamers_file(filepath):
+    """Parse add_roamers.txt to extract patrol names and coordinates"""
+    text = Path(filepath).read_text(encoding='utf-8')
 
-    return patrols
+    return [
+        {
+            'name': match['name'],
+            'coords': [float(match[2]), float(match[3]), float(match[4])]
+        }
+        for match in ROAMER_PATTERN.finditer(text)
+    ]
 
 
 def create_roaming_patrol_template(name, coords, existing_template):
     """Create a new patrol entry based on existing ROAMING patrol template"""
-    # Deep copy the template
-    new_patrol = json.loads(json.dumps(existing_template))
+    # Only Name and Waypoints differ, so a shallow copy is enough; the other
+    # (shared) values are never mutated and serialize the same
+    return {
+        **existing_template,
+        'Name': f'Roaming-{name}',
+        'Waypoints': [coords],
+    }
 
-    # Update name and waypoint
-    new_patrol['Name'] = f'Roaming-{name}'
-    new_patrol['Waypoints'] = [coords]
 
-    return new_patrol
+def write_settings(settings_file, data):
+    """Atomically write AIPatrolSettings.json as UTF-8 with 2-space indentation"""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        # Same bytes as the orjson branch: non-ASCII names stay as raw UTF-8
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    write_bytes_atomic(settings_file, payload)
 
 
 def add_roaming_patrols(settings_file, roamers_file, dry_run=False):
     """Add roaming patrols from roamers_file to settings_file"""
 
     # Load AIPatrolSettings.json
-    with open(settings_file, 'r') as f:
+    with open(settings_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
-    # Find existing ROAMING patrols to use as template
-    patrols = data.get('Patrols', [])
-    roaming_patrols = [p for p in patrols if p.get('Behaviour') == 'ROAMING']
+    # Single pass: collect existing names (to avoid duplicates) and use the
+    # first ROAMING patrol as the template
+    template = None
+    existing_names = set()
+    for patrol in data.get('Patrols', []):
+        existing_names.add(patrol['Name'])
+        if template is None and patrol.get('Behaviour') == 'ROAMING':
+            template = patrol
 
-    if not roaming_patrols:
+    if template is None:
         print("ERROR: No existing ROAMING patrols found in AIPatrolSettings.json")
         return False
 
-    # Use first roaming patrol as template
-    template = roaming_patrols[0]
     print(f"Using template from: {template['Name']}")
 
     # Parse roamers file
@@ -89,9 +89,6 @@ def add_roaming_patrols(settings_file, roamers_file, dry_run=False):
     for patrol in new_patrols:
         print(f"  - {patrol['name']}: {patrol['coords']}")
 
-    # Check for existing patrol names to avoid duplicates
-    existing_names = {p['Name'] for p in patrols}
-
     # Create new patrol entries
     added_count = 0
     skipped_count = 0
@@ -120,8 +117,7 @@ def add_roaming_patrols(settings_file, roamers_file, dry_run=False):
 
     # Save updated file
     if not dry_run and added_count > 0:
-        with open(settings_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        write_settings(settings_file, data)
         print(f"\n✓ Successfully added {added_count} new patrols to {settings_file}")
 
     if skipped_count > 0:
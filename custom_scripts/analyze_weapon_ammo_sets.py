@@ -6,41 +6,47 @@ This helps identify potentially under-equipped bot configurations.
 
 import json
 import os
+import re
 import argparse
-from collections import defaultdict
+from collections import Counter
+from functools import lru_cache
 
+WEAPON_INDICATORS = [
+    'AK', 'M4', 'Mosin', 'SKS', 'Winchester', 'Blaze', 'CR', 'VSD', 'SVD', 'VSS',
+    'UMP', 'MP5', 'Bizon', 'Scorpion', 'FNX', 'Glock', 'Makarov', 'Magnum',
+    'Shotgun', 'Izh', 'B95', 'Scout', 'Hunting', 'Repeater', 'Carbine',
+    'M79', 'LAR', 'Tundra', 'Pioneer', 'Longhorn', 'Deagle', 'P1', 'Mkii',
+    'SSG82', 'FAMAS', 'AUG'
+]
+
+# Exclude obvious non-weapons
+NON_WEAPONS = ['Ammo_', 'Mag_', 'Optic', 'Suppressor', 'Compensator', 'Bayonet']
+
+# One alternation per list so each check is a single scan of the class name
+_WEAPON_RE = re.compile('|'.join(map(re.escape, WEAPON_INDICATORS)))
+_NON_WEAPON_RE = re.compile('|'.join(map(re.escape, NON_WEAPONS)))
+
+@lru_cache(maxsize=None)
 def is_weapon_class(class_name):
     """Check if a class name appears to be a weapon (basic heuristics)"""
-    weapon_indicators = [
-        'AK', 'M4', 'Mosin', 'SKS', 'Winchester', 'Blaze', 'CR', 'VSD', 'SVD', 'VSS',
-        'UMP', 'MP5', 'Bizon', 'Scorpion', 'FNX', 'Glock', 'Makarov', 'Magnum',
-        'Shotgun', 'Izh', 'B95', 'Scout', 'Hunting', 'Repeater', 'Carbine',
-        'M79', 'LAR', 'Tundra', 'Pioneer', 'Longhorn', 'Deagle', 'P1', 'Mkii',
-        'SSG82', 'FAMAS', 'AUG'
-    ]
-    
-    # Exclude obvious non-weapons
-    non_weapons = ['Ammo_', 'Mag_', 'Optic', 'Suppressor', 'Compensator', 'Bayonet']
-    
-    for exclude in non_weapons:
-        if exclude in class_name:
-            return False
-            
-    for indicator in weapon_indicators:
-        if indicator in class_name:
-            return True
-            
-    return False
+    if _NON_WEAPON_RE.search(class_name):
+        return False
+    return bool(_WEAPON_RE.search(class_name))
+
+@lru_cache(maxsize=None)
+def _classify(class_name):
+    """Classify a class name as 'ammo', 'mag', 'weapon' or 'other'"""
+    if class_name.startswith('Ammo_'):
+        return 'ammo'
+    if class_name.startswith('Mag_'):
+        return 'mag'
+    if is_weapon_class(class_name):
+        return 'weapon'
+    return 'other'
 
 def find_items_in_inventory_cargo(cargo_list):
-    """Find all items in InventoryCargo, returns dict of {class_name: count}"""
-    items = defaultdict(int)
-    
-    for item in cargo_list:
-        class_name = item.get('ClassName', '')
-        items[class_name] += 1
-    
-    return dict(items)
+    """Find all items in InventoryCargo, returns Counter of {class_name: count}"""
+    return Counter(item.get('ClassName', '') for item in cargo_list)
 
 def analyze_set_for_weapons_and_ammo(set_item, set_index, loadout_name):
     """Analyze a single Set for weapons and corresponding ammo/magazines"""
@@ -72,27 +78,32 @@ def analyze_set_for_weapons_and_ammo(set_item, set_index, loadout_name):
                 'location': 'InventoryCargo'
             })
     
-    # For each weapon found, check if there's corresponding ammo/magazines
+    # Look for ammo (Ammo_) or magazines (Mag_) in the Set's InventoryCargo.
+    # This only depends on the Set, so categorize once for all its weapons.
+    ammo_items = []
+    mag_items = []
+    for name in inventory_items:
+        category = _classify(name)
+        if category == 'ammo':
+            ammo_items.append(name)
+        elif category == 'mag':
+            mag_items.append(name)
+    
+    total_ammo_count = sum(inventory_items[item] for item in ammo_items)
+    total_mag_count = sum(inventory_items[item] for item in mag_items)
+    has_ammo_or_mags = bool(ammo_items or mag_items)
+    
     for weapon_info in weapons_found:
-        weapon_name = weapon_info['weapon']
-        weapon_location = weapon_info['location']
-        
-        # Look for ammo (Ammo_) or magazines (Mag_) in the Set's InventoryCargo
-        ammo_items = [name for name in inventory_items.keys() if name.startswith('Ammo_')]
-        mag_items = [name for name in inventory_items.keys() if name.startswith('Mag_')]
-        
-        total_ammo_items = len(ammo_items) + len(mag_items)
-        
         results.append({
             'loadout': loadout_name,
             'set_index': set_index,
-            'weapon': weapon_name,
-            'weapon_location': weapon_location,
+            'weapon': weapon_info['weapon'],
+            'weapon_location': weapon_info['location'],
             'ammo_items': ammo_items,
             'mag_items': mag_items,
-            'total_ammo_count': sum(inventory_items[item] for item in ammo_items),
-            'total_mag_count': sum(inventory_items[item] for item in mag_items),
-            'has_ammo_or_mags': total_ammo_items > 0,
+            'total_ammo_count': total_ammo_count,
+            'total_mag_count': total_mag_count,
+            'has_ammo_or_mags': has_ammo_or_mags,
             'all_inventory_items': inventory_items
         })
     
@@ -180,12 +191,12 @@ def main():
             print(f"Error: Directory {loadouts_dir} not found")
             return
         
-        for filename in os.listdir(loadouts_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(loadouts_dir, filename)
-                print(f"Analyzing {filename}...")
-                results = analyze_loadout_file(filepath)
-                all_results.extend(results)
+        with os.scandir(loadouts_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    print(f"Analyzing {entry.name}...")
+                    results = analyze_loadout_file(entry.path)
+                    all_results.extend(results)
     
     print_analysis_report(all_results)
     
@@ -3,8 +3,11 @@
 Script to filter SNAFU_types.xml to keep only the type entries listed in types-keep.txt
 """
 
-import re
 import os
+import shutil
+import xml.etree.ElementTree as ET
+
+from _snafu_common import load_keep, read_header
 
 def main():
     # File paths
@@ -13,61 +16,51 @@ def main():
     backup_file = xml_file + ".backup"
     
     # Read the list of type names to keep
-    with open(keep_file, 'r', encoding='utf-8') as f:
-        keep_types = set()
-        for line in f:
-            line = line.strip()
-            if line:
-                keep_types.add(line)
+    keep_types = load_keep(keep_file)
     
     print(f"Found {len(keep_types)} type names to keep:")
     for name in sorted(keep_types):
         print(f"  - {name}")
     
-    # Read the original XML file
-    with open(xml_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Create backup
-    with open(backup_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    # Create backup (byte-for-byte copy, the original stays in place)
+    shutil.copyfile(xml_file, backup_file)
     print(f"Created backup: {backup_file}")
     
-    # Pattern to match type entries
-    # This matches from <type name="..."> to its corresponding </type>
-    type_pattern = r'<type name="([^"]+)">(.*?)</type>'
-    
-    # Find all type entries
-    matches = re.findall(type_pattern, content, re.DOTALL)
-    print(f"Found {len(matches)} total type entries in XML")
+    # Stream each <type> element, writing the kept ones straight to the output
+    header = read_header(
+        xml_file,
+        default='<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n<types>\n'
+    )
+    footer = '</types>\n'
     
-    # Filter and rebuild content
-    header = content.split('<type name=')[0]  # Everything before first type entry
-    footer = '</types>'  # Closing tag
-    
-    filtered_entries = []
+    tmp_file = xml_file + ".tmp"
     kept_count = 0
     removed_count = 0
     
-    for type_name, type_content in matches:
-        if type_name in keep_types:
-            full_entry = f'<type name="{type_name}">{type_content}</type>'
-            filtered_entries.append(full_entry)
-            kept_count += 1
-            print(f"KEEPING: {type_name}")
-        else:
-            removed_count += 1
-            print(f"REMOVING: {type_name}")
-    
-    # Rebuild the file
-    new_content = header
-    for entry in filtered_entries:
-        new_content += entry + '\n    '
-    new_content = new_content.rstrip() + '\n' + footer
+    with open(tmp_file, 'w', encoding='utf-8', buffering=1 << 20) as out:
+        out.write(header)
+        # Keep comments as tree nodes so the ones inside a kept <type> are written back
+        parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+        entries = ET.iterparse(xml_file, events=("start", "end"), parser=parser)
+        _, root = next(entries)
+        for event, elem in entries:
+            if event != "end" or elem.tag != "type":
+                continue
+            type_name = elem.get("name")
+            if type_name in keep_types:
+                elem.tail = None
+                out.write('    ' + ET.tostring(elem, encoding="unicode") + '\n')
+                kept_count += 1
+                print(f"KEEPING: {type_name}")
+            else:
+                removed_count += 1
+                print(f"REMOVING: {type_name}")
+            # Drop the handled entry from the root too so memory stays flat
+            root.clear()
+        out.write(footer)
     
-    # Write the filtered content
-    with open(xml_file, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    os.replace(tmp_file, xml_file)
+    print(f"Found {kept_count + removed_count} total type entries in XML")
     
     print(f"\nOperation completed:")
     print(f"  - Kept: {kept_count} type entries")
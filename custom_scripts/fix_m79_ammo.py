@@ -6,11 +6,38 @@ This script moves Ammo_40mm_Explosive from M79 weapon's InventoryCargo
 to the Set's InventoryCargo, since weapons don't have internal storage.
 """
 
-import json
 import os
 import sys
+from functools import partial
 from pathlib import Path
 
+from _loadout_common import (dumps_json, file_stamp, lazy_check, load_json, load_stamps, run_pipeline,
+                             save_stamps, stamp_key)
+
+SHOULDER_SLOT = 'Shoulder'
+M79 = 'M79'
+M79_AMMO = 'Ammo_40mm_Explosive'
+
+
+def has_m79_ammo_to_fix(data):
+    """
+    Check whether any Set has Ammo_40mm_Explosive inside an M79's InventoryCargo.
+    
+    Only uses .get() and iteration, so it works on plain dicts as well as lazy
+    simdjson documents (where only the touched values get materialized).
+    """
+    for set_data in data.get('Sets', ()):
+        for attachment in set_data.get('InventoryAttachments', ()):
+            if attachment.get('SlotName') != SHOULDER_SLOT:
+                continue
+            for item in attachment.get('Items', ()):
+                if item.get('ClassName') != M79:
+                    continue
+                for cargo_item in item.get('InventoryCargo', ()):
+                    if cargo_item.get('ClassName') == M79_AMMO:
+                        return True
+    return False
+
 
 def fix_m79_ammo_in_loadout(data):
     """
@@ -24,79 +51,96 @@ def fix_m79_ammo_in_loadout(data):
     """
     changes_made = False
     change_log = []
+    _get = dict.get  # Bound once; called for every node in the hot loops below
     
-    # Process each Set
-    sets = data.get('Sets', [])
-    for set_idx, set_data in enumerate(sets):
-        set_name = set_data.get('ClassName', f'Set_{set_idx}')
-        
+    # Process each Set; `or ()` falls back without allocating a throwaway list
+    for set_idx, set_data in enumerate(_get(data, 'Sets') or ()):
         # Look for M79 weapons in this set's InventoryAttachments
-        for attachment in set_data.get('InventoryAttachments', []):
-            if attachment.get('SlotName') == 'Shoulder':
-                for item in attachment.get('Items', []):
-                    if item.get('ClassName') == 'M79':
-                        # Found M79! Check if it has ammo in its InventoryCargo
-                        m79_cargo = item.get('InventoryCargo', [])
-                        ammo_to_move = []
-                        
-                        # Find all Ammo_40mm_Explosive in M79's cargo
-                        for cargo_idx in range(len(m79_cargo) - 1, -1, -1):  # Reverse order for safe removal
-                            cargo_item = m79_cargo[cargo_idx]
-                            if cargo_item.get('ClassName') == 'Ammo_40mm_Explosive':
-                                ammo_to_move.append(cargo_item)
-                                m79_cargo.pop(cargo_idx)  # Remove from weapon cargo
-                                changes_made = True
-                                change_log.append(f"Set {set_idx} ({set_name}): Moved Ammo_40mm_Explosive from M79 InventoryCargo to Set InventoryCargo")
-                        
-                        # Add the moved ammo to the Set's InventoryCargo
-                        if ammo_to_move:
-                            set_inventory_cargo = set_data.setdefault('InventoryCargo', [])
-                            set_inventory_cargo.extend(ammo_to_move)
+        for attachment in _get(set_data, 'InventoryAttachments') or ():
+            try:
+                if attachment['SlotName'] != SHOULDER_SLOT:
+                    continue
+            except KeyError:
+                continue
+            for item in _get(attachment, 'Items') or ():
+                if _get(item, 'ClassName') != M79:
+                    continue
+                # Found M79! Check if it has ammo in its InventoryCargo
+                m79_cargo = _get(item, 'InventoryCargo')
+                if not m79_cargo:
+                    continue
+                cargo_to_keep = []
+                ammo_to_move = []
+                
+                # Split M79's cargo into Ammo_40mm_Explosive and everything else in one pass
+                for cargo_item in m79_cargo:
+                    if _get(cargo_item, 'ClassName') == M79_AMMO:
+                        ammo_to_move.append(cargo_item)
+                    else:
+                        cargo_to_keep.append(cargo_item)
+                
+                # Move the ammo to the Set's InventoryCargo
+                if ammo_to_move:
+                    m79_cargo[:] = cargo_to_keep
+                    set_data.setdefault('InventoryCargo', []).extend(ammo_to_move)
+                    changes_made = True
+                    # Only name the Set once there is something to log
+                    set_name = _get(set_data, 'ClassName', f'Set_{set_idx}')
+                    change_log.append(f"Set {set_idx} ({set_name}): Moved {len(ammo_to_move)} Ammo_40mm_Explosive entries from M79 InventoryCargo to Set InventoryCargo")
     
     return data, changes_made, change_log
 
 
-def process_loadout_file(file_path, dry_run=False):
+def process_loadout_file(file_path, raw, dry_run=False):
     """
     Process a single loadout file.
     
     Args:
         file_path: Path to the loadout JSON file
+        raw: The file's contents, already read by run_pipeline
         dry_run: If True, don't write changes, just report what would be done
         
     Returns:
-        tuple: (success, changes_made, change_log)
+        tuple: ((success, changes_made, change_log, parsed), new_bytes or None);
+        parsed is False for files skipped by the byte prefilter, which are
+        never checked for being valid JSON
     """
     try:
         print(f"Processing: {file_path}")
         
-        # Read the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if b'"M79"' not in raw:
+            # No M79 anywhere in the file, so nothing can need fixing
+            print(f"  Skipped without parsing (no M79 in file): {file_path}")
+            return (True, False, [], False), None
+        # Scan lazily first and only build Python objects if there is work to do
+        if lazy_check(raw, has_m79_ammo_to_fix) is False:
+            print(f"  No M79 ammo issues found in {file_path}")
+            return (True, False, [], True), None
+        data = load_json(file_path, raw)
         
         # Fix M79 ammo placement
         modified_data, changes_made, change_log = fix_m79_ammo_in_loadout(data)
         
+        payload = None
         if changes_made:
             print(f"  Changes needed in {file_path}:")
             for log_entry in change_log:
                 print(f"    - {log_entry}")
                 
             if not dry_run:
-                # Write the modified data back
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(modified_data, f, indent=4, ensure_ascii=False)
-                print(f"  ✓ Changes written to {file_path}")
+                # Serialize here; run_pipeline's writer thread writes it back and
+                # main() reports it once the write has succeeded
+                payload = dumps_json(modified_data)
             else:
                 print(f"  ✓ Dry run - no changes written")
         else:
             print(f"  No M79 ammo issues found in {file_path}")
             
-        return True, changes_made, change_log
+        return (True, changes_made, change_log, True), payload
         
     except Exception as e:
         print(f"  ❌ Error processing {file_path}: {e}")
-        return False, False, []
+        return (False, False, [], True), None
 
 
 def main():
@@ -107,9 +151,14 @@ def main():
     parser.add_argument('files', nargs='*', help='Specific loadout files to process')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be changed without making changes')
     parser.add_argument('--all', action='store_true', help='Process all loadout files in config/ExpansionMod/Loadouts/')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Reprocess files even if unchanged since the last run')
     
     args = parser.parse_args()
     
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    
     if not args.files and not args.all:
         print("Usage: python fix_m79_ammo.py [--dry-run] [--all | file1.json file2.json ...]")
         print("Examples:")
@@ -123,39 +172,65 @@ def main():
         # Find all loadout files
         loadout_dir = Path("config/ExpansionMod/Loadouts")
         if loadout_dir.exists():
-            files_to_process = list(loadout_dir.glob("*.json"))
+            files_to_process = loadout_dir.glob("*.json")
         else:
             print(f"❌ Directory not found: {loadout_dir}")
             sys.exit(1)
     else:
-        files_to_process = [Path(f) for f in args.files]
+        files_to_process = (Path(f) for f in args.files)
     
     # Process files
-    total_files = len(files_to_process)
+    total_files = 0
     successful_files = 0
+    skipped_files = 0
     files_with_changes = 0
     
-    print(f"Processing {total_files} files...")
+    print("Processing files...")
     print("=" * 50)
     
+    # Files this script already checked or fixed, and that nothing has touched since
+    stamps = load_stamps('fix_m79_ammo.py')
+    
+    existing_files = []
     for file_path in files_to_process:
+        total_files += 1
         if not file_path.exists():
             print(f"❌ File not found: {file_path}")
             continue
-            
-        success, changes_made, change_log = process_loadout_file(file_path, args.dry_run)
-        
+        if not args.force and stamps.get(stamp_key(file_path)) == file_stamp(file_path):
+            print(f"Unchanged since last run, skipping: {file_path}")
+            successful_files += 1
+            continue
+        existing_files.append(file_path)
+    
+    # Files are independent: read, fix and write them in an overlapped pipeline
+    worker = partial(process_loadout_file, dry_run=args.dry_run)
+    results = run_pipeline(existing_files, worker, jobs=args.jobs)
+    
+    for file_path, (success, changes_made, change_log, parsed) in results:
+        if not parsed:
+            # Not stamped either: it was never confirmed to be a valid loadout
+            skipped_files += 1
+            continue
         if success:
             successful_files += 1
             if changes_made:
                 files_with_changes += 1
-        
-        print()  # Empty line between files
+                if not args.dry_run:
+                    print(f"  ✓ Changes written to {file_path}")
+            # A dry run that found changes left the file unfixed, so don't stamp it
+            if not (args.dry_run and changes_made):
+                stamps[stamp_key(file_path)] = file_stamp(file_path)
+    
+    save_stamps('fix_m79_ammo.py', stamps)
+    
+    print()
     
     # Summary
     print("=" * 50)
     print(f"Summary:")
     print(f"  Total files processed: {successful_files}/{total_files}")
+    print(f"  Skipped without parsing (no M79 in file): {skipped_files}")
     print(f"  Files with M79 ammo changes: {files_with_changes}")
     
     if args.dry_run:
@@ -26,52 +26,51 @@ import sys
 import os
 from pathlib import Path
 
-def has_m79_and_ammo(set_item):
-    """Check if a Set contains M79 and its ammo"""
+from _loadout_common import dump_json, file_stamp, load_json, load_stamps, save_stamps, stamp_key
+
+HANDS_SLOT = "Hands"
+M79 = "M79"
+FNX45 = "FNX45"
+M79_AMMO = "Ammo_40mm_Explosive"
+TRACKED_CLASSES = frozenset({M79, FNX45, M79_AMMO})
+
+# Returned by process_loadout_file for files the byte prefilter rejected unparsed
+SKIPPED = "skipped"
+
+def scan_set(set_item):
+    """
+    Walk a Set's attachments and cargo once.
+    
+    Returns (has_m79_and_ammo, hands_index, fnx45_index): the position of the
+    first "Hands" slot in InventoryAttachments and of the first FNX45 inside it,
+    each -1 if not present.
+    """
+    _get = dict.get  # Bound once; called for every item in the loops below
     has_m79 = False
-    has_ammo = False
-    
-    # Check InventoryAttachments for M79
-    for attachment in set_item.get("InventoryAttachments", []):
-        for item in attachment.get("Items", []):
-            if item.get("ClassName") == "M79":
+    hands_index = -1
+    fnx45_index = -1
+    
+    for attachment_index, attachment in enumerate(_get(set_item, "InventoryAttachments", [])):
+        in_hands = hands_index == -1 and _get(attachment, "SlotName") == HANDS_SLOT
+        if in_hands:
+            hands_index = attachment_index
+        for item_index, item in enumerate(_get(attachment, "Items", [])):
+            class_name = _get(item, "ClassName")
+            # One hashed test rejects the common case before the string compares
+            if class_name not in TRACKED_CLASSES:
+                continue
+            if class_name == M79:
                 has_m79 = True
-                break
+            elif in_hands and class_name == FNX45 and fnx45_index == -1:
+                fnx45_index = item_index
     
-    # Check InventoryCargo for Ammo_40mm_Explosive
-    for cargo_item in set_item.get("InventoryCargo", []):
-        if cargo_item.get("ClassName") == "Ammo_40mm_Explosive":
-            has_ammo = True
-            break
+    # Check InventoryCargo for Ammo_40mm_Explosive (only matters with an M79)
+    has_ammo = has_m79 and any(
+        _get(cargo_item, "ClassName") == M79_AMMO
+        for cargo_item in _get(set_item, "InventoryCargo", [])
+    )
     
-    return has_m79 and has_ammo
-
-def find_and_remove_fnx45_from_hands(set_item):
-    """Find and remove FNX45 from Hands slot, return it if found"""
-    fnx45_item = None
-    
-    # Look through InventoryAttachments for Hands slot
-    for attachment in set_item.get("InventoryAttachments", []):
-        if attachment.get("SlotName") == "Hands":
-            # Check each item in Hands slot
-            items_to_keep = []
-            for item in attachment.get("Items", []):
-                if item.get("ClassName") == "FNX45":
-                    fnx45_item = item.copy()  # Store the FNX45 item
-                    print(f"    Found FNX45 in Hands slot, removing...")
-                else:
-                    items_to_keep.append(item)
-            
-            # Update the Items list without the FNX45
-            attachment["Items"] = items_to_keep
-            
-            # If Hands slot is now empty, we could remove it entirely
-            if not items_to_keep:
-                print(f"    Hands slot is now empty")
-            
-            break
-    
-    return fnx45_item
+    return has_ammo, hands_index, fnx45_index
 
 def add_fnx45_to_cargo(set_item, fnx45_item):
     """Add FNX45 item to InventoryCargo"""
@@ -82,63 +81,63 @@ def add_fnx45_to_cargo(set_item, fnx45_item):
     set_item["InventoryCargo"].append(fnx45_item)
     print(f"    Added FNX45 to InventoryCargo")
 
-def clean_empty_hands_slots(set_item):
-    """Remove empty Hands attachment slots"""
-    if "InventoryAttachments" not in set_item:
-        return
-    
-    attachments_to_keep = []
-    for attachment in set_item["InventoryAttachments"]:
-        if attachment.get("SlotName") == "Hands":
-            # Keep only if it has items
-            if attachment.get("Items"):
-                attachments_to_keep.append(attachment)
-            else:
-                print(f"    Removed empty Hands slot")
-        else:
-            attachments_to_keep.append(attachment)
-    
-    set_item["InventoryAttachments"] = attachments_to_keep
-
 def process_loadout_file(file_path, dry_run=False):
-    """Process a single loadout file"""
+    """
+    Process a single loadout file.
+    
+    Returns whether it was (or would be) modified, None on error, or SKIPPED if
+    the byte prefilter ruled it out without parsing (so it is not known to be valid JSON).
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        raw = Path(file_path).read_bytes()
+        # Only files mentioning both an M79 and an FNX45 can need a move
+        if b'"M79"' not in raw or b'"FNX45"' not in raw:
+            print(f"[INFO] Skipped without parsing (M79 or FNX45 not in file): {file_path}")
+            return SKIPPED
+        data = load_json(file_path, raw)
     except (json.JSONDecodeError, FileNotFoundError) as e:
         print(f"Error reading {file_path}: {e}")
-        return False
+        return None
     
     sets_modified = 0
     total_modifications = []
     
     # Process all Sets in the loadout
     for set_item in data.get("Sets", []):
-        if has_m79_and_ammo(set_item):
-            # Try to find and remove FNX45 from Hands slot
-            fnx45_item = find_and_remove_fnx45_from_hands(set_item)
-            
-            if fnx45_item:
-                if not dry_run:
-                    # Move it to InventoryCargo
-                    add_fnx45_to_cargo(set_item, fnx45_item)
-                    
-                    # Clean up empty Hands slots
-                    clean_empty_hands_slots(set_item)
-                    
-                    sets_modified += 1
-                    total_modifications.append("Moved FNX45 from Hands to InventoryCargo")
-                else:
-                    print(f"  [DRY RUN] Would move FNX45 from Hands to InventoryCargo")
-                    sets_modified += 1
-            else:
-                print(f"  No FNX45 found in Hands slot (may already be moved)")
+        has_m79_ammo, hands_index, fnx45_index = scan_set(set_item)
+        if not has_m79_ammo:
+            continue
+        
+        if fnx45_index == -1:
+            print(f"  No FNX45 found in Hands slot (may already be moved)")
+            continue
+        
+        attachments = set_item["InventoryAttachments"]
+        hands_items = attachments[hands_index]["Items"]
+        print(f"    Found FNX45 in Hands slot, removing...")
+        if len(hands_items) == 1:
+            print(f"    Hands slot is now empty")
+        
+        if dry_run:
+            print(f"  [DRY RUN] Would move FNX45 from Hands to InventoryCargo")
+            sets_modified += 1
+            continue
+        
+        # Move it to InventoryCargo
+        add_fnx45_to_cargo(set_item, hands_items.pop(fnx45_index))
+        
+        # Clean up the Hands slot if that emptied it
+        if not hands_items:
+            del attachments[hands_index]
+            print(f"    Removed empty Hands slot")
+        
+        sets_modified += 1
+        total_modifications.append("Moved FNX45 from Hands to InventoryCargo")
     
     if sets_modified > 0:
         if not dry_run:
             # Write back to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            dump_json(file_path, data)
             print(f"[MODIFIED] Moved FNX45 in {sets_modified} Sets in {file_path}")
         else:
             print(f"[DRY RUN] Would modify {sets_modified} Sets in {file_path}")
@@ -147,13 +146,30 @@ def process_loadout_file(file_path, dry_run=False):
         print(f"[INFO] No FNX45 movements needed in {file_path}")
         return False
 
+def process_unless_stamped(file_path, stamps, dry_run=False, force=False):
+    """Run process_loadout_file unless the file's stamp shows nothing changed since it was last handled"""
+    key = stamp_key(file_path)
+    if not force and stamps.get(key) == file_stamp(file_path):
+        print(f"[INFO] Unchanged since last run, skipping {file_path}")
+        return False
+    modified = process_loadout_file(file_path, dry_run)
+    if modified is SKIPPED:
+        # Never confirmed to be a valid loadout, so don't stamp it
+        return False
+    # A dry run that found moves left the file unfixed, so don't stamp it
+    if modified is not None and not (dry_run and modified):
+        stamps[key] = file_stamp(file_path)
+    return bool(modified)
+
 def main():
     parser = argparse.ArgumentParser(description='Move FNX45 pistols from Hands to InventoryCargo in M79 Sets')
     parser.add_argument('file', nargs='?', help='Loadout file to process')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be changed without modifying files')
     parser.add_argument('--all', action='store_true', help='Process all loadout files with M79s')
+    parser.add_argument('--force', action='store_true', help='Reprocess files even if unchanged since the last run')
     
     args = parser.parse_args()
+    stamps = load_stamps('move_fnx45_from_hands_to_cargo.py')
     
     if args.all:
         # Process all known loadout files with M79s
@@ -169,7 +185,7 @@ def main():
         for file_path in loadout_files:
             if os.path.exists(file_path):
                 print(f"\nProcessing {file_path}...")
-                if process_loadout_file(file_path, args.dry_run):
+                if process_unless_stamped(file_path, stamps, args.dry_run, args.force):
                     files_modified += 1
             else:
                 print(f"[WARNING] File not found: {file_path}")
@@ -185,11 +201,13 @@ def main():
             sys.exit(1)
         
         print(f"Processing {args.file}...")
-        process_loadout_file(args.file, args.dry_run)
+        process_unless_stamped(args.file, stamps, args.dry_run, args.force)
     
     else:
         parser.print_help()
         sys.exit(1)
+    
+    save_stamps('move_fnx45_from_hands_to_cargo.py', stamps)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,19 +4,34 @@ Plot AI Location positions from AILocationSettings.json on an X/Y scatter plot.
 Labels each point with its location name.
 """
 
+import argparse
 import json
+import numpy as np
+import matplotlib
+# Only ever renders to a file, so skip the GUI backend probe on import
+matplotlib.use('Agg')
+matplotlib.rcParams['text.usetex'] = False
 import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
+from matplotlib.collections import EllipseCollection
+from matplotlib.colors import to_rgba
 from datetime import datetime
 from pathlib import Path
 
-def plot_ai_locations(json_file_path, output_dir=None):
+# Plotted range on both axes: full map (0-12800 meters) with some padding
+MAP_EXTENT = (-500, 13000)
+
+# Labels of points falling in the same square of this many pixels are merged into one
+LABEL_CELL_PX = 20
+
+def plot_ai_locations(json_file_path, output_dir=None, draw_radii=True, extent=MAP_EXTENT):
     """
     Read AILocationSettings.json and create an X/Y scatter plot of all locations.
 
     Args:
         json_file_path: Path to the AILocationSettings.json file
         output_dir: Directory to save the output image (defaults to current directory)
+        draw_radii: Draw each location's Radius as a circle around it
+        extent: (min, max) axis range in meters for both axes, or None to autoscale
     """
     # Read the JSON file
     with open(json_file_path, 'r') as f:
@@ -30,62 +45,72 @@ def plot_ai_locations(json_file_path, output_dir=None):
         return
 
     # Extract X, Y coordinates, names, and radius values
-    x_coords = []
-    y_coords = []
-    names = []
-    radii = []
-
-    for location in locations:
-        position = location.get('Position', [])
-        name = location.get('Name', 'Unknown')
-        radius = location.get('Radius', 100.0)  # Default to 100 if not specified
+    locations = [location for location in locations if len(location.get('Position', [])) >= 3]
+    names = [location.get('Name', 'Unknown') for location in locations]
 
-        if len(position) >= 3:
-            x = position[0]  # First coordinate
-            y = position[2]  # Third coordinate (middle is always 0)
-
-            x_coords.append(x)
-            y_coords.append(y)
-            names.append(name)
-            radii.append(radius)
+    # X is the first coordinate, Y the third (middle is always 0)
+    points = np.array([(location['Position'][0], location['Position'][2]) for location in locations],
+                      dtype=np.float64).reshape(-1, 2)
+    radii = np.fromiter((location.get('Radius', 100.0) for location in locations),  # Default to 100
+                        dtype=np.float64, count=len(locations))
 
     # Create the plot
     fig, ax = plt.subplots(figsize=(10, 10), dpi=100)  # 1000x1000 pixels (10 inches * 100 dpi)
 
-    # Draw circles with actual radius values (in data coordinates = meters)
-    for i in range(len(x_coords)):
-        circle = Circle((x_coords[i], y_coords[i]), radii[i],
-                       fill=True, facecolor='red', alpha=0.3,
-                       edgecolor='darkred', linewidth=1.5)
-        ax.add_patch(circle)
+    if draw_radii:
+        # Draw circles with actual radius values (in data coordinates = meters),
+        # all in a single collection instead of one patch per location
+        diameters = 2 * radii
+        circles = EllipseCollection(diameters, diameters, np.zeros_like(radii),
+                                    units='xy', offsets=points, offset_transform=ax.transData,
+                                    facecolors=to_rgba('red', 0.3), edgecolors=to_rgba('darkred', 0.3),
+                                    linewidths=1.5)
+        ax.add_collection(circles)
 
     # Plot center points for visibility
-    ax.scatter(x_coords, y_coords, c='red', s=20, alpha=0.8, edgecolors='black', linewidth=0.5, zorder=5)
-
-    # Add labels for each point
-    for i, name in enumerate(names):
-        ax.annotate(name, (x_coords[i], y_coords[i]),
-                   fontsize=6,
-                   alpha=0.8,
-                   xytext=(3, 3),  # Offset text slightly from point
-                   textcoords='offset points',
-                   zorder=6)
+    ax.scatter(points[:, 0], points[:, 1], c='red', s=20, alpha=0.8, edgecolors='black', linewidth=0.5, zorder=5)
 
     # Set labels and title
     ax.set_xlabel('X Coordinate (meters)', fontsize=12)
     ax.set_ylabel('Y Coordinate (meters)', fontsize=12)
-    ax.set_title('AI Location Positions (circles show radius)', fontsize=14, fontweight='bold')
+    title = 'AI Location Positions (circles show radius)' if draw_radii else 'AI Location Positions'
+    ax.set_title(title, fontsize=14, fontweight='bold')
 
     # Add grid for better readability
     ax.grid(True, alpha=0.3, linestyle='--')
 
     # Set axis limits to show full map (0-12800 meters) with some padding
-    ax.set_xlim(-500, 13000)
-    ax.set_ylim(-500, 13000)
+    if extent is not None:
+        ax.set_xlim(*extent)
+        ax.set_ylim(*extent)
 
     # Make sure the plot is square with equal aspect ratio
     ax.set_aspect('equal', adjustable='box')
 
+    # Add labels, skipping points that fall outside the plotted extent. Points that
+    # land in the same pixel cell share one label, e.g. "Name(+2)" for three points
+    if extent is not None:
+        in_view = ((points >= extent[0]) & (points <= extent[1])).all(axis=1)
+    else:
+        in_view = np.ones(len(points), dtype=bool)
+    visible = np.flatnonzero(in_view)
+    # Lay out the figure first: tight_layout resizes the axes, which rescales
+    # data-to-pixel. Then settle limits and aspect so transData matches the saved PNG
+    fig.tight_layout()
+    ax.apply_aspect()
+    cells = (ax.transData.transform(points[visible]) // LABEL_CELL_PX).astype(int)
+    clusters = {}
+    for i, cell in zip(visible, map(tuple, cells)):
+        clusters.setdefault(cell, []).append(i)
+    for members in clusters.values():
+        label = names[members[0]] if len(members) == 1 else f"{names[members[0]]}(+{len(members) - 1})"
+        ax.annotate(label, points[members].mean(axis=0),
+                   fontsize=6,
+                   alpha=0.8,
+                   xytext=(3, 3),  # Offset text slightly from point
+                   textcoords='offset points',
+                   zorder=6)
+
     # Generate timestamp for filename
     timestamp = datetime.now().strftime('%Y%m%d%H%M')
     output_filename = f'AILocationsPlots-{timestamp}.png'
@@ -96,16 +121,21 @@ def plot_ai_locations(json_file_path, output_dir=None):
     else:
         output_path = Path(output_filename)
 
-    # Save the figure
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=100, bbox_inches='tight')
+    # Save the figure. With fixed axis limits the tight_layout figure already fits,
+    # so skip the extra render pass that bbox_inches='tight' needs to measure it
+    fig.savefig(output_path, dpi=100, bbox_inches='tight' if extent is None else None)
     print(f"Plot saved to: {output_path}")
     print(f"Total locations plotted: {len(names)}")
 
     # Close the plot to free memory
-    plt.close()
+    plt.close(fig)
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plot AI locations from AILocationSettings.json')
+    parser.add_argument('--radius-circles', action=argparse.BooleanOptionalAction, default=True,
+                        help='Draw location radii and fix the axes to the full map extent (default: on)')
+    args = parser.parse_args()
+
     # Default path to AILocationSettings.json
     # Adjust this path if running from a different location
     json_path = Path(__file__).parent.parent / 'mpmissions' / 'dayzOffline.enoch' / 'expansion' / 'settings' / 'AILocationSettings.json'
@@ -114,4 +144,6 @@ if __name__ == '__main__':
     output_directory = Path(__file__).parent
 
     print(f"Reading AI locations from: {json_path}")
-    plot_ai_locations(json_path, output_directory)
+    plot_ai_locations(json_path, output_directory,
+                      draw_radii=args.radius_circles,
+                      extent=MAP_EXTENT if args.radius_circles else None)
@@ -1,79 +1,178 @@
-import json
-import os
+import argparse
+import fnmatch
+import re
+from functools import partial
+from pathlib import Path
+import xml.etree.ElementTree as ET
 
-IGNORE_FILES = [
+from _loadout_common import (dumps_json, file_stamp, load_json, load_stamps, run_pipeline,
+                             save_stamps, stamp_key)
+
+IGNORE_FILES = frozenset({
     "FireFighterLoadout.json",
     "PlayerFemaleSuitLoadout.json",
     "PlayerMaleSuitLoadout.json",
     "PlayerSurvivorLoadout.json"
-]
+})
+
+# The only loadout keys whose values can hold items; Quantity, Health,
+# ConstructionPartsBuilt etc. never contain Ammo_ entries and are not descended into
+CONTAINER_KEYS = ("Sets", "InventoryAttachments", "InventoryCargo", "Items")
+
+# Files without a match cannot contain ammo entries and are skipped unparsed
+AMMO_CLASS_RE = re.compile(rb'"ClassName"\s*:\s*"Ammo_')
 
-def update_ammo_properties(json_file, chance, min_quantity, max_quantity):
-    """Update ammo properties for all items with ClassName starting with 'Ammo_'"""
-    # Read the JSON file
-    with open(json_file, 'r') as file:
-        data = json.load(file)
+def load_ammo_names(types_xml):
+    """Collect every 'Ammo_' type name declared in a types.xml into a frozenset"""
+    ammo_names = set()
+    for _, elem in ET.iterparse(types_xml):
+        if elem.tag == "type":
+            name = elem.get("name")
+            if name is not None and name.startswith("Ammo_"):
+                ammo_names.add(name)
+            elem.clear()
+    return frozenset(ammo_names)
+
+def update_ammo_properties(json_file, raw, chance, min_quantity, max_quantity, ammo_names=None):
+    """
+    Update ammo properties for all items with ClassName starting with 'Ammo_'.
+    
+    raw is the already-read content of json_file. If ammo_names is given, only
+    ClassNames in that set are updated. Returns the new file bytes, or None if
+    nothing changed.
+    """
+    data = load_json(json_file, raw)
 
     # Track if any changes were made
     changes_made = False
 
-    # Function to recursively search and update ammo properties
-    def update_ammo_recursive(item):
-        nonlocal changes_made
-        if isinstance(item, dict):
+    # Walk the item containers with an explicit stack instead of recursion
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if type(item) is list:
+            stack.extend(item)
+        elif type(item) is dict:
             # Check if the item is an Ammo_ type
-            if item.get("ClassName", "").startswith("Ammo_"):
+            class_name = item.get("ClassName")
+            if class_name is not None and (
+                class_name in ammo_names if ammo_names is not None else class_name.startswith("Ammo_")
+            ):
                 # Update Chance, Min, and Max values
                 item["Chance"] = chance
                 item["Quantity"]["Min"] = min_quantity
                 item["Quantity"]["Max"] = max_quantity
                 changes_made = True
-
-            # Continue searching through all keys
-            for key, value in item.items():
-                if isinstance(value, (dict, list)):
-                    update_ammo_recursive(value)
-                        
-        elif isinstance(item, list):
-            for sub_item in item:
-                update_ammo_recursive(sub_item)
-
-    # Start the recursive search from the root of the JSON
-    update_ammo_recursive(data)
+            for key in CONTAINER_KEYS:
+                value = item.get(key)
+                if value is not None:
+                    stack.append(value)
 
     # Only write back if changes were made
     if changes_made:
-        with open(json_file, 'w') as file:
-            json.dump(data, file, indent=4)
-        print(f"Updated ammo properties in {json_file}")
-        return True
+        return dumps_json(data)
     else:
         print(f"No ammo entries found in {json_file}")
-        return False
+        return None
 
-def process_directory_for_ammo_updates(directory_path, chance, min_quantity, max_quantity):
-    """Process all JSON files in directory to update ammo properties"""
-    files_updated = 0
+def _update_file(json_file, raw, chance, min_quantity, max_quantity, ammo_names=None):
+    """
+    Pipeline worker: returns (status, new_bytes).
     
-    for root, dirs, files in os.walk(directory_path):
-        for file in files:
-            # Skip files in the ignore list
-            if file in IGNORE_FILES:
-                print(f"Skipping ignored file: {file}")
-                continue
-                
-            if file.endswith('.json'):
-                json_file = os.path.join(root, file)
-                try:
-                    if update_ammo_properties(json_file, chance, min_quantity, max_quantity):
-                        files_updated += 1
-                except Exception as e:
-                    print(f"Error processing {json_file}: {str(e)}")
+    status is "updated", "unchanged", "skipped" (no Ammo_ ClassName in the raw
+    bytes, so never parsed) or "error". Errors are reported per file instead of
+    aborting the batch.
+    """
+    # Cheap byte-level check before any parsing
+    if not AMMO_CLASS_RE.search(raw):
+        print(f"Skipped without parsing (no Ammo_ ClassName in file): {json_file}")
+        return "skipped", None
+    try:
+        payload = update_ammo_properties(json_file, raw, chance, min_quantity, max_quantity, ammo_names)
+    except Exception as e:
+        print(f"Error processing {json_file}: {str(e)}")
+        return "error", None
+    return ("updated" if payload is not None else "unchanged"), payload
+
+def compile_exclude(patterns=()):
+    """Compile IGNORE_FILES plus extra glob patterns into one regex matched against file names"""
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in sorted(IGNORE_FILES | set(patterns))))
+
+def process_directory_for_ammo_updates(directory_path, chance, min_quantity, max_quantity, jobs=None, ammo_names=None,
+                                       force=False, exclude=()):
+    """
+    Process all JSON files in directory to update ammo properties.
+    
+    Files whose name is in IGNORE_FILES or matches one of the exclude glob
+    patterns are skipped, as are files already updated with the same settings
+    and untouched since (unless force is set).
+    """
+    exclude_re = compile_exclude(exclude)
+
+    # A file updated with other settings still needs updating, so they are part of the key
+    stamp_name = f"update_ammo_amts.py chance={chance} min={min_quantity} max={max_quantity}"
+    if ammo_names is not None:
+        stamp_name += f" ammo={','.join(sorted(ammo_names))}"
+    stamps = load_stamps(stamp_name)
+    
+    json_files = []
+    
+    for json_file in Path(directory_path).rglob('*.json'):
+        # Skip files in the ignore list or matching an --exclude pattern
+        if exclude_re.match(json_file.name):
+            print(f"Skipping ignored file: {json_file.name}")
+            continue
+        if not force and stamps.get(stamp_key(json_file)) == file_stamp(json_file):
+            print(f"Unchanged since last run, skipping: {json_file}")
+            continue
+        json_files.append(json_file)
+    
+    # Files are independent: read, update and write them in an overlapped pipeline
+    worker = partial(_update_file, chance=chance, min_quantity=min_quantity, max_quantity=max_quantity,
+                     ammo_names=ammo_names)
+    results = run_pipeline(json_files, worker, jobs=jobs)
+    
+    files_updated = 0
+    files_skipped = 0
+    for json_file, status in results:
+        if status == "skipped":
+            # Not stamped either: it was never confirmed to be a valid loadout
+            files_skipped += 1
+            continue
+        if status == "error":
+            continue
+        if status == "updated":
+            # Results only include files whose write-back succeeded
+            print(f"Updated ammo properties in {json_file}")
+            files_updated += 1
+        stamps[stamp_key(json_file)] = file_stamp(json_file)
+    save_stamps(stamp_name, stamps)
     
     print(f"Total files updated: {files_updated}")
+    print(f"Total files skipped without parsing: {files_skipped}")
 
 # Configuration
 directory_path = r'C:\Program Files (x86)\Steam\steamapps\common\DayZServerChernaTrader\config\ExpansionMod\Loadouts'
 
-# Usage - Update ammo properties for all Ammo_ items
-process_directory_for_ammo_updates(directory_path, chance=0.2, min_quantity=0.2, max_quantity=0.4)
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description='Update Chance/Quantity of all Ammo_ entries in loadout files')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--types-xml', help='Only update Ammo_ types declared in this types.xml '
+                                            '(default: every ClassName starting with Ammo_)')
+    parser.add_argument('--force', action='store_true', help='Reprocess files even if unchanged since the last run')
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help='Skip files whose name matches this glob (repeatable; added to the built-in ignore list)')
+    args = parser.parse_args()
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    # Read the ammo enumeration once up front; workers receive it pickled with each file
+    ammo_names = load_ammo_names(args.types_xml) if args.types_xml else None
+
+    # Usage - Update ammo properties for all Ammo_ items
+    process_directory_for_ammo_updates(directory_path, chance=0.2, min_quantity=0.2, max_quantity=0.4, jobs=args.jobs,
+                                       ammo_names=ammo_names, force=args.force, exclude=args.exclude)
+
+if __name__ == '__main__':
+    main()